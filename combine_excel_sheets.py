@@ -1,20 +1,161 @@
 import pandas as pd
 import os
-import matplotlib.pyplot as plt
-import seaborn as sns
+import hashlib
+import logging
+import importlib.util
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, repeat
+
+logger = logging.getLogger(__name__)
+
+# Checked once at import without loading the module; main() reports it if the reader is missing.
+_HAVE_CALAMINE = importlib.util.find_spec('python_calamine') is not None
+
+# The only columns the analysis uses; every other column is skipped when the workbooks are read.
+REQUIRED_COLS = ['CA', 'PCYL1', 'Cylinde~', 'RockerN~']
+
+# Name of the Parquet cache written alongside the Excel files; the key it was built for is stored inside.
+CACHE_FILE_NAME = 'traces_cache.parquet'
+
+# Bump whenever the loading rules change (units-row handling, dtypes, ...) so older caches are rebuilt.
+CACHE_FORMAT_VERSION = 1
+
+def _read_one(i: int, directory: str, prefix: str) -> tuple[list[tuple[str, str, pd.DataFrame]], bool]:
+    """
+    Read every sheet of a single Excel file into a list of DataFrames.
+    
+    The file name is built from the prefix and the zero-padded index. The workbook is opened once and
+    its sheets are read one at a time. If a sheet has a units row ("deg" in the 'CA' column), that
+    row is removed, and any text left in the sensor columns becomes NaN. Only the columns in
+    `REQUIRED_COLS` are kept, and sheets with none of them, or with no data rows, are skipped. Each
+    DataFrame is returned with its source file and sheet name so the caller can add traceability columns
+    once, after concatenation.
+    This function runs inside a worker process, so it must stay at module level.
+    
+    Parameters:
+        i (int): The index of the file to read.
+        directory (str): The path to the directory containing the Excel files.
+        prefix (str): The common prefix of the Excel files (e.g. "Traces-").
+        
+    Returns:
+        tuple[list[tuple[str, str, pd.DataFrame]], bool]: One (file name, sheet name, DataFrame) entry per
+        sheet that was read, and whether the file and all of its sheets were read without error.
+    """
+    dataframes = []
+    complete = True
+    file_name = f"{prefix}{i:03d}.xlsx"
+    file_path = os.path.join(directory, file_name)
+    logger.debug("Processing file: %s", file_name)
+    
+    try:
+        xl = pd.ExcelFile(file_path, engine='calamine')
+    except Exception as e:
+        logger.warning("Error reading %s: %s", file_name, e)
+        return dataframes, False
+    
+    with xl:
+        logger.debug("  Found %s sheet(s) in %s.", len(xl.sheet_names), file_name)
+        
+        # Read the sheets one at a time from the already-open workbook, so only one raw sheet is held in
+        # memory at once alongside the processed frames. Each sheet is decoded exactly once.
+        last_columns = None
+        for sheet_name in xl.sheet_names:
+            logger.debug("    Processing sheet: %s", sheet_name)
+            try:
+                df = pd.read_excel(xl, sheet_name=sheet_name, usecols=lambda col: col in REQUIRED_COLS)
+            except Exception as e:
+                logger.warning("Error reading sheet %s from %s: %s", sheet_name, file_name, e)
+                complete = False
+                continue
+            if df.columns.empty:
+                logger.debug("    Skipping sheet without required columns: %s.", sheet_name)
+                continue
+            
+            # Sheets in a workbook normally share one layout, so the 'CA' position is only looked up
+            # again when the columns change.
+            if last_columns is None or not df.columns.equals(last_columns):
+                last_columns = df.columns
+                ca_loc = df.columns.get_loc('CA') if 'CA' in df.columns else -1
+            
+            # Check if the first row of data contains unit information (e.g. "deg" in 'CA') and drop it.
+            # Unit text in the other columns is turned into NaN by the coercion below.
+            first_val = df.iat[0, ca_loc] if not df.empty and ca_loc >= 0 else None
+            if isinstance(first_val, str) and first_val.strip().lower() == "deg":
+                logger.debug("    Removing units row from sheet: %s in file %s.", sheet_name, file_name)
+                df = df.iloc[1:]
+            
+            # A header-only sheet, or one holding just the units row, would leave object columns behind.
+            if df.empty:
+                logger.debug("    Skipping sheet without data rows: %s.", sheet_name)
+                continue
+            
+            # Coerce rather than fail on stray text (e.g. an 'ERR' cell) so the rest of the sheet is kept.
+            # Whole-number columns come back as int64, so cast to float64 to give every sheet one schema.
+            df = df.apply(pd.to_numeric, errors='coerce').astype(np.float64)
+            
+            dataframes.append((file_name, sheet_name, df))
+            logger.debug("    Finished processing sheet: %s.", sheet_name)
+    
+    return dataframes, complete
+
+def _stack_frames(dataframes: list[pd.DataFrame], total_rows: int) -> pd.DataFrame:
+    """
+    Stack the per-sheet DataFrames vertically into a single DataFrame with a fresh index.
+    
+    Sensor readings carry far less precision than float64 holds, so float64 columns are stored as float32
+    to halve the memory and bandwidth used by the analysis. When every sheet has the same columns and
+    NumPy dtypes (the usual case for the trace files), each output column is allocated once at its final
+    length and dtype, and every sheet is cast into its slice, so the result is built without an
+    intermediate concat buffer and each column is already contiguous. Sheets with differing schemas fall
+    back to `pd.concat`, followed by the float32 cast, which also consolidates the result into contiguous
+    blocks.
+    
+    Parameters:
+        dataframes (list[pd.DataFrame]): The per-sheet DataFrames, in output order.
+        total_rows (int): The total number of rows across all the DataFrames.
+        
+    Returns:
+        pd.DataFrame: The stacked DataFrame.
+    """
+    dtypes = dataframes[0].dtypes
+    uniform = (
+        dtypes.index.is_unique
+        and all(isinstance(dtype, np.dtype) for dtype in dtypes)
+        and all(df.dtypes.equals(dtypes) for df in dataframes)
+    )
+    if not uniform:
+        combined_df = pd.concat(dataframes, ignore_index=True)
+        num_cols = combined_df.select_dtypes('float64').columns
+        return combined_df.astype({col: np.float32 for col in num_cols})
+    
+    out = {
+        col: np.empty(total_rows, dtype=np.float32 if dtype == np.float64 else dtype)
+        for col, dtype in dtypes.items()
+    }
+    offset = 0
+    for df in dataframes:
+        n = len(df)
+        for col, values in out.items():
+            values[offset:offset + n] = df[col].to_numpy()
+        offset += n
+    return pd.DataFrame(out, copy=False)
 
 def load_excel_files(directory: str, prefix: str, start: int, end: int) -> pd.DataFrame:
     """
     Load Excel files and all their sheets from a specified directory and combine them into a single DataFrame.
     
-    This function iterates over a range of Excel files whose names are composed of a given prefix 
+    This function reads a range of Excel files whose names are composed of a given prefix 
     followed by a zero-padded numerical index and the '.xlsx' extension. File Traces-015.xlsx is skipped 
-    because it is known to be corrupted. For each valid file, the function reads all sheets at once into a
-    dictionary using the 'sheet_name=None' parameter and then iterates over this dictionary. For each sheet, 
-    if the first row appears to contain unit information (e.g. the value in the 'CA' column is "deg"), that row 
-    is removed. Additional columns are added to record the source file and sheet name for traceability. 
-    Finally, all the individual DataFrames are concatenated into one master DataFrame.
+    because it is known to be corrupted. The files are independent, so each one is read in its own worker
+    process by `_read_one`, which skips any units row (e.g. the value in the 'CA' column is "deg").
+    Finally, all the individual DataFrames are concatenated into one master DataFrame, and categorical
+    columns recording the source file and sheet name of each row are added for traceability.
+    
+    The combined DataFrame is cached as a single Parquet file (`CACHE_FILE_NAME`) in the same directory,
+    together with a hash of the file names, their modification times and the loader version. Later calls
+    with unchanged files reload the cache instead of parsing the workbooks again. The cache is only written when every file
+    and sheet was read successfully, and an unreadable cache is ignored.
     
     Parameters:
         directory (str): The path to the directory containing the Excel files.
@@ -25,56 +166,83 @@ def load_excel_files(directory: str, prefix: str, start: int, end: int) -> pd.Da
     Returns:
         pd.DataFrame: A single DataFrame containing the data from all sheets across all valid Excel files.
     """
-    dataframes = []
+    # Skip the known corrupted file, e.g. Traces-015.xlsx.
+    if start <= 15 <= end:
+        logger.debug("Skipping corrupted file: %s%03d.xlsx", prefix, 15)
     
+    # List the directory once so missing files are skipped up front rather than failing to open. Names
+    # are compared with normcase so that matching is case-insensitive on Windows, like opening the file.
+    try:
+        with os.scandir(directory) as entries:
+            existing = {os.path.normcase(e.name): e for e in entries if e.name.lower().endswith('.xlsx')}
+    except OSError as e:
+        logger.warning("Error listing %s: %s", directory, e)
+        existing = {}
+    indices = []
     for i in range(start, end + 1):
-        # Skip the known corrupted file, e.g. Traces-015.xlsx.
-        if i == 15:
-            print(f"Skipping corrupted file: {prefix}{i:03d}.xlsx")
-            continue
-        
         file_name = f"{prefix}{i:03d}.xlsx"
-        file_path = os.path.join(directory, file_name)
-        print(f"Processing file: {file_name}...")
-        
-        try:
-            xl = pd.ExcelFile(file_path, engine='openpyxl')
-        except Exception as e:
-            print(f"Error reading {file_name}: {e}")
+        if os.path.normcase(file_name) not in existing or i == 15:
+            if i != 15:
+                logger.warning("Skipping missing file: %s", file_name)
             continue
-        
-        # Read all sheets at once into a dictionary.
+        indices.append(i)
+    
+    # Reuse the cached result if none of the files have changed since it was written. The loader version
+    # and column selection are part of the key so that changing either invalidates the cache.
+    matched_files = [f"{prefix}{i:03d}.xlsx" for i in indices]
+    key = hashlib.sha1(repr((CACHE_FORMAT_VERSION, REQUIRED_COLS, sorted((f, existing[os.path.normcase(f)].stat().st_mtime) for f in matched_files))).encode()).hexdigest()
+    cache_path = os.path.join(directory, CACHE_FILE_NAME)
+    if os.path.exists(cache_path):
+        # Check the key in the file footer first, so a stale cache is never loaded in full.
         try:
-            sheets_dict = xl.parse(sheet_name=None, engine='openpyxl')
+            import pyarrow.parquet as pq
+            metadata = pq.read_schema(cache_path).metadata or {}
+            if metadata.get(b'cache_key') == key.encode():
+                logger.debug("Loading cached data from %s.", cache_path)
+                return pd.read_parquet(cache_path)
         except Exception as e:
-            print(f"Error reading sheets from {file_name}: {e}")
-            continue
+            logger.warning("Error reading cache %s: %s", cache_path, e)
+    
+    # Parsing is CPU-bound and holds the GIL, so use processes rather than threads. Each worker pays for
+    # a fresh interpreter, so start no more than there are files.
+    results = []
+    if indices:
+        with ProcessPoolExecutor(max_workers=min(len(indices), os.cpu_count() or 1)) as executor:
+            results = list(executor.map(_read_one, indices, repeat(directory), repeat(prefix)))
+    sheets_read = list(chain.from_iterable(entries for entries, _ in results))
+    complete = all(file_complete for _, file_complete in results)
+    del results
+    
+    if sheets_read:
+        files, sheets, dataframes = zip(*sheets_read)
+        del sheets_read
+        lengths = [len(df) for df in dataframes]
+        combined_df = _stack_frames(dataframes, sum(lengths))
+        # Drop the per-sheet frames before the analysis starts.
+        del dataframes
         
-        print(f"  Found {len(sheets_dict)} sheet(s) in {file_name}.")
+        # Add metadata columns for traceability, stored as categoricals built from per-sheet row counts.
+        file_codes, file_names = pd.factorize(pd.Index(files))
+        sheet_codes, sheet_names = pd.factorize(pd.Index(sheets))
+        combined_df['source_file'] = pd.Categorical.from_codes(np.repeat(file_codes, lengths), categories=file_names)
+        combined_df['sheet_name'] = pd.Categorical.from_codes(np.repeat(sheet_codes, lengths), categories=sheet_names)
+        logger.debug("All files and sheets have been processed and combined.")
         
-        # Iterate over the dictionary of DataFrames
-        for sheet_name, df in sheets_dict.items():
-            print(f"    Processing sheet: {sheet_name}...")
-            # Check if the first row of data contains unit information (e.g. "deg" in 'CA')
-            if not df.empty and 'CA' in df.columns:
-                first_val = str(df.iloc[0]['CA']).strip().lower()
-                if first_val == "deg":
-                    print(f"    Removing units row from sheet: {sheet_name} in file {file_name}.")
-                    df = df.iloc[1:].reset_index(drop=True)
-            
-            # Add metadata columns for traceability.
-            df['source_file'] = file_name
-            df['sheet_name'] = sheet_name
-            dataframes.append(df)
-            
-            print(f"    Finished processing sheet: {sheet_name}.")
-    
-    if dataframes:
-        combined_df = pd.concat(dataframes, ignore_index=True)
-        print("All files and sheets have been processed and combined.")
+        # Don't cache a partial result, otherwise files that failed to read would never be retried.
+        if complete:
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                table = pa.Table.from_pandas(combined_df, preserve_index=False)
+                table = table.replace_schema_metadata({**(table.schema.metadata or {}), b'cache_key': key.encode()})
+                pq.write_table(table, cache_path, compression='zstd')
+            except Exception as e:
+                logger.warning("Error writing cache %s: %s", cache_path, e)
+        else:
+            logger.warning("Some files or sheets could not be read, so the cache was not updated.")
     else:
         combined_df = pd.DataFrame()
-        print("No data was loaded. The resulting DataFrame is empty.")
+        logger.warning("No data was loaded. The resulting DataFrame is empty.")
     
     return combined_df
 
@@ -99,11 +267,17 @@ def perform_visualisation_analysis(df: pd.DataFrame):
     This function creates plots to reveal the distribution of key variables and explore potential
     relationships between them. Adjust the column names as per your data structure.
     """
+    # Imported here so that loading the data, or importing this module, does not pay for plotting.
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    
     # Example: Plot histogram of cylinder pressure (assumed to be 'PCYL1')
     if 'PCYL1' in df.columns:
         plt.figure(figsize=(8, 5))
-        data_numeric = pd.to_numeric(df['PCYL1'], errors='coerce').dropna()
-        plt.hist(data_numeric, bins=30, edgecolor='black')
+        data_numeric = df['PCYL1'].dropna().to_numpy()
+        # Bin with NumPy and draw the bars directly rather than letting matplotlib bin every value.
+        counts, edges = np.histogram(data_numeric, bins=30)
+        plt.bar(edges[:-1], counts, width=np.diff(edges), align='edge', edgecolor='black')
         plt.title("Distribution of Cylinder Pressure (PCYL1)")
         plt.xlabel("Cylinder Pressure")
         plt.ylabel("Frequency")
@@ -112,16 +286,18 @@ def perform_visualisation_analysis(df: pd.DataFrame):
     # Example: Scatter plot for two variables (adjust column names as needed)
     if all(col in df.columns for col in ['Cylinde~', 'PCYL1']):
         plt.figure(figsize=(8, 5))
-        x = pd.to_numeric(df['Cylinde~'], errors='coerce')
-        y = pd.to_numeric(df['PCYL1'], errors='coerce')
-        plt.scatter(x, y, alpha=0.7)
+        x = df['Cylinde~'].to_numpy()
+        y = df['PCYL1'].to_numpy()
+        # Plot a fixed random sample of at most 10,000 points; the rest would only be overdrawn.
+        idx = np.random.default_rng(0).choice(len(x), size=min(10_000, len(x)), replace=False)
+        plt.scatter(x[idx], y[idx], alpha=0.7)
         plt.xlabel("Cylinde~")
         plt.ylabel("Cylinder Pressure (PCYL1)")
         plt.title("Relationship Between Cylinde~ and Cylinder Pressure")
         plt.show()
     
     # Example: Correlation Matrix Heatmap (using numeric columns only)
-    numeric_cols = df.select_dtypes(include=['float64', 'int64']).columns
+    numeric_cols = df.select_dtypes(include=['float32', 'float64', 'int64']).columns
     if len(numeric_cols) > 1:
         plt.figure(figsize=(10, 8))
         corr = df[numeric_cols].corr()
@@ -141,11 +317,14 @@ def perform_feature_engineering(df: pd.DataFrame) -> pd.DataFrame:
     """
     # Create a new feature that is the difference between 'Cylinde~' and 'RockerN~'
     if all(col in df.columns for col in ['Cylinde~', 'RockerN~']):
-        df['sensor_diff'] = pd.to_numeric(df['Cylinde~'], errors='coerce') - pd.to_numeric(df['RockerN~'], errors='coerce')
+        df['sensor_diff'] = df['Cylinde~'].to_numpy(dtype=np.float32) - df['RockerN~'].to_numpy(dtype=np.float32)
     
     # Log-transform cylinder pressure ('PCYL1') to reduce skew (ensure no negatives or zeros)
     if 'PCYL1' in df.columns:
-        df['log_pressure'] = np.log(pd.to_numeric(df['PCYL1'], errors='coerce') + 1e-6)
+        p = df['PCYL1'].to_numpy(dtype=np.float32, copy=False)
+        # Add the offset into a new buffer and take the log in place, so only one array is allocated.
+        buf = np.add(p, 1e-6)
+        df['log_pressure'] = np.log(buf, out=buf)
     
     print("Feature engineering complete. New features added: 'sensor_diff', 'log_pressure'")
     return df
@@ -158,10 +337,10 @@ def main():
     directory, performs data quality checks, visualises the data, and applies feature engineering. It then
     outputs a summary of the combined DataFrame.
     """
-    try:
-        import openpyxl  # noqa: F401
-    except ModuleNotFoundError:
-        print("openpyxl is not installed. Please install it using 'pip install openpyxl' or 'conda install openpyxl' and then re-run the script.")
+    logging.basicConfig(level=logging.WARNING)
+    
+    if not _HAVE_CALAMINE:
+        print("python-calamine is not installed. Please install it using 'pip install python-calamine' or 'conda install python-calamine' and then re-run the script.")
         return
 
     # Define the directory path (handle backslashes correctly with a raw string)